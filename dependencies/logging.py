@@ -44,3 +44,19 @@ class Log4j(object):
         """
         self.logger.info(message)
         return None
+
+    def debug(self, message):
+        """Log debug information.
+
+        :param: Debug message to write to log
+        :return: None
+        """
+        self.logger.debug(message)
+        return None
+
+    def is_debug_enabled(self):
+        """Check whether debug messages would be logged.
+
+        :return: True if the logger is enabled for DEBUG
+        """
+        return self.logger.isDebugEnabled()
@@ -0,0 +1,17 @@
+"""
+paths.py
+~~~~~~~~
+
+Module containing the storage locations shared by the ETL jobs and
+their tests.
+"""
+
+# root of the project as mounted inside the Spark containers
+CODE_ROOT = 'file:///code'
+
+EMPLOYEES_PARQUET_PATH = (
+    CODE_ROOT + '/tests/domain/system/test_unit/test_data/employees')
+EMPLOYEES_REPORT_PARQUET_PATH = (
+    CODE_ROOT + '/tests/domain/system/test_unit/test_data/employees_report')
+OUTPUT_EMPLOYEES_PATH = (
+    CODE_ROOT + '/tests/domain/system/test_integration/output_employees')
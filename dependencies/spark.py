@@ -7,13 +7,31 @@ Module containing helper function for use with Apache Spark
 
 import __main__
 
+from functools import lru_cache
 from os import environ, listdir, path
 import json
-from pyspark import SparkFiles
+from pyspark import SparkConf, SparkFiles
 from pyspark.sql import SparkSession
 
 from dependencies import logging
 
+# Spark SQL config applied to every session, regardless of how the job
+# was launched, unless the key is already set through spark-submit,
+# spark-defaults.conf, `spark_config` or the active session.
+DEFAULT_SPARK_CONFIG = {
+    'spark.sql.parquet.filterPushdown': 'true',
+    'spark.sql.parquet.enableVectorizedReader': 'true',
+    'spark.sql.sources.parallelPartitionDiscovery.threshold': '32',
+    'spark.sql.execution.arrow.pyspark.enabled': 'true',
+    'spark.sql.codegen.wholeStage': 'true',
+    'spark.sql.adaptive.enabled': 'true',
+    'spark.sql.adaptive.coalescePartitions.enabled': 'true',
+    'spark.sql.adaptive.advisoryPartitionSizeInBytes': '128m',
+}
+
+# upper bound for the shuffle partitions derived from the cluster size
+MAX_SHUFFLE_PARTITIONS = 200
+
 
 def start_spark(app_name='my_spark_app', master='local[*]', jar_packages=[],
                 files=[], spark_config={}):
@@ -50,7 +68,8 @@ def start_spark(app_name='my_spark_app', master='local[*]', jar_packages=[],
     :param jar_packages: List of Spark JAR package names.
     :param files: List of files to send to Spark cluster (master and
         workers).
-    :param spark_config: Dictionary of config key-value pairs.
+    :param spark_config: Dictionary of config key-value pairs, taking
+        precedence over DEFAULT_SPARK_CONFIG.
     :return: A tuple of references to the Spark session, logger and
         config dict (only if available).
     """
@@ -84,10 +103,29 @@ def start_spark(app_name='my_spark_app', master='local[*]', jar_packages=[],
         for key, val in spark_config.items():
             spark_builder.config(key, val)
 
+    # apply defaults that were not explicitly set elsewhere
+    submitted_conf = SparkConf()
+    applied_config = spark_config if (flag_repl or flag_debug) else {}
+    active_sess = SparkSession.getActiveSession()
+    for key, val in DEFAULT_SPARK_CONFIG.items():
+        if not is_configured(key, submitted_conf, applied_config,
+                             active_sess):
+            spark_builder.config(key, val)
+
     # create session and retrieve Spark logger object
     spark_sess = spark_builder.getOrCreate()
     spark_logger = logging.Log4j(spark_sess)
 
+    # size shuffles to the cluster unless explicitly configured, AQE
+    # coalesces them further at runtime
+    cores = cluster_cores(spark_sess)
+    if cores and not is_configured('spark.sql.shuffle.partitions',
+                                   submitted_conf, applied_config,
+                                   active_sess):
+        shuffle_partitions = min(2 * cores, MAX_SHUFFLE_PARTITIONS)
+        spark_sess.conf.set(
+            'spark.sql.shuffle.partitions', str(shuffle_partitions))
+
     # get config file if sent to cluster with --files
     spark_files_dir = SparkFiles.getRootDirectory()
     config_files = [filename
@@ -96,11 +134,74 @@ def start_spark(app_name='my_spark_app', master='local[*]', jar_packages=[],
 
     if config_files:
         path_to_config_file = path.join(spark_files_dir, config_files[0])
-        with open(path_to_config_file, 'r') as config_file:
-            config_dict = json.load(config_file)
+        config_dict = load_config(path_to_config_file)
         spark_logger.warn('loaded config from ' + config_files[0])
     else:
         spark_logger.warn('no config file found')
         config_dict = None
 
     return spark_sess, spark_logger, config_dict
+
+
+def is_configured(key, spark_conf, spark_config, spark=None):
+    """Check whether a Spark config key has been explicitly set.
+
+    :param key: Spark config key.
+    :param spark_conf: SparkConf loaded from spark-submit and
+        spark-defaults.conf.
+    :param spark_config: Config key-value pairs applied to the builder.
+    :param spark: Already active SparkSession object, if any.
+    :return: True if the key is set in any of them.
+    """
+    return (key in spark_config
+            or spark_conf.contains(key)
+            or (spark is not None and spark.conf.get(key, None) is not None))
+
+
+def cluster_cores(spark):
+    """Total number of cores the application is configured to use.
+
+    Executors may not have registered yet when the session is created,
+    so outside local mode this is derived from the configured resources
+    rather than from `defaultParallelism`.
+
+    :param spark: SparkSession object.
+    :return: Number of cores, or None if it cannot be determined.
+    """
+    spark_context = spark.sparkContext
+    spark_conf = spark_context.getConf()
+
+    if spark_context.master.startswith('local'):
+        return spark_context.defaultParallelism
+    if spark_conf.contains('spark.cores.max'):
+        return int(spark_conf.get('spark.cores.max'))
+    if (spark_conf.contains('spark.executor.instances')
+            and spark_conf.contains('spark.executor.cores')):
+        return (int(spark_conf.get('spark.executor.instances'))
+                * int(spark_conf.get('spark.executor.cores')))
+    return None
+
+
+def load_config(path_to_config_file):
+    """Parse a JSON config file.
+
+    The file contents are memoised on its path, so repeated `start_spark`
+    calls within the same process (e.g. re-running notebook cells) do
+    not read it again. Each call returns a freshly parsed dict, which
+    callers are free to modify.
+
+    :param path_to_config_file: Path to the JSON config file.
+    :return: Dict of ETL job configuration parameters.
+    """
+    return json.loads(read_config_file(path_to_config_file))
+
+
+@lru_cache(maxsize=1)
+def read_config_file(path_to_config_file):
+    """Read a config file, memoised on its path.
+
+    :param path_to_config_file: Path to the config file.
+    :return: Contents of the file.
+    """
+    with open(path_to_config_file, 'r') as config_file:
+        return config_file.read()
@@ -32,51 +32,96 @@ functions, such that the key Transform steps can be covered by tests
 and jobs or called from within another environment (e.g. a Jupyter or
 Zeppelin notebook).
 """
-import sys
-import argparse
+from dependencies.paths import (
+    EMPLOYEES_PARQUET_PATH, EMPLOYEES_REPORT_PARQUET_PATH,
+    OUTPUT_EMPLOYEES_PATH)
 from dependencies.spark import start_spark
-from pyspark.sql import Row
+from pyspark import StorageLevel
 from pyspark.sql.functions import col, concat_ws, lit
-
-
-def main(args: list) -> None:
+from pyspark.sql.types import LongType, StringType, StructField, StructType
+
+# fixed schema of the employees dataset, saves Spark inferring it from
+# the Parquet footers
+EMPLOYEES_SCHEMA = StructType([
+    StructField('id', LongType()),
+    StructField('first_name', StringType()),
+    StructField('second_name', StringType()),
+    StructField('floor', LongType())
+])
+
+# Parquet layout for the test data, smaller row groups give finer
+# grained row-group pruning on read. The codec can be overridden with
+# the 'parquet_compression' config key; zstd needs Spark >= 3.2 (or a
+# libhadoop built with zstd support).
+PARQUET_WRITE_OPTIONS = {
+    'compression': 'snappy',
+    'parquet.block.size': str(64 * 1024 * 1024),
+    'parquet.enable.dictionary': 'true'
+}
+
+
+def main() -> None:
     """Main ETL script definition.
 
-    Parameters:
-        args (list): argumentos came from sys.args
+    All job parameters (job_name, steps_per_floor, paths, ...) come from
+    the etl_config.json file sent with the job.
 
     Returns:
         None:Returning value
     """
-    # Parsing submmited variables
-    job_name, steps_per_floor = set_up_args(args)
-
     # start Spark application and get Spark session, logger and config
     spark, log, config_dict= start_spark(
-        app_name=job_name)
+        app_name='etl_job_base',
+        files=['configs/etl_config.json'])
 
-    # log that main ETL job is starting
-    log.info('etl_job is up-and-running')
+    if config_dict is None:
+        log.error('no config file found, submit the job with '
+                  '--files configs/etl_config.json')
+        spark.stop()
+        raise RuntimeError('etl_config.json was not sent with the job')
 
     # execute ETL pipeline
-    job(spark, log, steps_per_floor)
+    job(spark, log, config_dict)
 
-    # log the success and terminate Spark application
-    log.info('test_etl_job is finished')
+    # terminate Spark application
     spark.stop()
     return None
 
 
-def extract_data(spark):
+def extract_data(spark, path=EMPLOYEES_PARQUET_PATH,
+                 columns=('id', 'first_name', 'second_name', 'floor'),
+                 floors=None, base_path=None):
     """Load data from Parquet file format.
 
+    The read uses the known EMPLOYEES_SCHEMA without schema merging. The
+    projection and the optional floors predicate are applied straight
+    after the read, so Spark prunes unused columns and pushes the filter
+    down to the Parquet row-group statistics or, when the dataset is
+    partitioned by `floor=`, skips whole partition directories.
+
     Parameters:
         spark (SparkSession): Main spark session for the job.
+        path (str): Location of the employees dataset.
+        columns (tuple): Columns required downstream.
+        floors (list): Optional floors to keep.
+        base_path (str): Root of a partitioned dataset, defaults to path.
 
     Returns:
         SparkDataframe:Spark DataFrame from the parquet
     """
-    return spark.read.parquet('file:///code/tests/domain/system/test_unit/test_data/employees')
+    df = (
+        spark
+        .read
+        .schema(EMPLOYEES_SCHEMA)
+        .option('mergeSchema', 'false')
+        .option('basePath', base_path or path)
+        .parquet(path)
+        .select(*columns))
+
+    if floors:
+        df = df.where(col('floor').isin(*floors))
+
+    return df
 
 
 def transform_data(df, steps_per_floor_):
@@ -87,6 +132,8 @@ def transform_data(df, steps_per_floor_):
         Street.
     :return: Transformed DataFrame.
     """
+    # built-in expressions only, so the whole select is compiled by
+    # whole-stage codegen; per-row Python logic should be a pandas_udf
     df_transformed = (
         df
         .select(
@@ -100,60 +147,154 @@ def transform_data(df, steps_per_floor_):
     return df_transformed
 
 
-def load_data(df):
-    """Collect data locally and write to CSV.
+def single_partition(df, repartition=True):
+    """Collapse a DataFrame into a single partition ahead of a write.
+
+    `coalesce(1)` avoids a shuffle but pulls the whole upstream
+    computation into a single task, whereas `repartition(1)` adds a
+    shuffle and keeps the upstream stages running in parallel.
+
+    :param df: DataFrame to collapse.
+    :param repartition: Use `repartition(1)` when True, otherwise
+        fall back to `coalesce(1)` (cheaper for tiny local runs).
+    :return: Single partition DataFrame.
+    """
+    return df.repartition(1) if repartition else df.coalesce(1)
+
+
+def load_data(df, path=OUTPUT_EMPLOYEES_PATH, fmt='parquet', header=True,
+              compression=None):
+    """Write data to Parquet (or CSV) with the DataFrame's parallelism.
+
+    Parquet output is Snappy compressed; CSV output, kept for consumers
+    that cannot read Parquet, is gzip compressed. Use `merge_output` to
+    turn CSV part files into a single file.
 
     :param df: DataFrame to print.
+    :param path: Output location.
+    :param fmt: Output format, either 'parquet' or 'csv'.
+    :param header: Write a header row in every CSV part file.
+    :param compression: Codec overriding the format default ('none'
+        disables compression).
     :return: None
     """
-    (df
-     .coalesce(1)
-     .write
-     .csv('file:///code/tests/domain/system/test_integration/output_employees', mode='overwrite', header=True))
+    writer = df.write
+
+    if fmt == 'parquet':
+        (writer
+         .option('compression', compression or 'snappy')
+         .parquet(path, mode='overwrite'))
+    elif fmt == 'csv':
+        (writer
+         .option('compression', compression or 'gzip')
+         .csv(path, mode='overwrite', header=header))
+    else:
+        raise ValueError('unsupported output format: ' + str(fmt))
+    return None
+
+
+def merge_output(spark, df, path, merged_path):
+    """Write data as CSV part files and merge them into a single file.
+
+    The parts are written in parallel, uncompressed and header-less, by
+    `load_data` and then streamed one after the other through the Hadoop
+    FileSystem API of the driver JVM, rather than collapsing the
+    DataFrame into one Spark task. The header is written once at the
+    top of the merged file.
+
+    :param spark: SparkSession object.
+    :param df: DataFrame to write.
+    :param path: Output location of the part files.
+    :param merged_path: Destination of the merged file.
+    :return: None
+    """
+    load_data(df, path, 'csv', header=False, compression='none')
+
+    hadoop = spark._jvm.org.apache.hadoop
+    hadoop_conf = spark._jsc.hadoopConfiguration()
+    src_fs = hadoop.fs.Path(path).getFileSystem(hadoop_conf)
+    dst_path = hadoop.fs.Path(merged_path)
+    dst_fs = dst_path.getFileSystem(hadoop_conf)
+
+    # globStatus returns the part files sorted by name, or None if the
+    # path does not exist
+    part_files = src_fs.globStatus(hadoop.fs.Path(path + '/part-*'))
+    if not part_files:
+        raise FileNotFoundError('no part files found in ' + path)
+
+    out_stream = dst_fs.create(dst_path, True)
+    try:
+        header = ','.join(df.columns) + '\n'
+        out_stream.write(bytearray(header.encode('utf-8')))
+        for part_file in part_files:
+            in_stream = src_fs.open(part_file.getPath())
+            try:
+                hadoop.io.IOUtils.copyBytes(
+                    in_stream, out_stream, hadoop_conf, False)
+            finally:
+                in_stream.close()
+    finally:
+        out_stream.close()
     return None
 
 
-def create_test_data(spark, config):
+def create_test_data(spark, config, repartition=True):
     """Create test data.
 
     This function creates both both pre- and post- transformation data
     saved as Parquet files in tests/test_data. This will be used for
     unit tests as well as to load as part of the example ETL job.
+    :param repartition: See `single_partition`, each fixture is written
+        as a single file.
     :return: None
     """
+    # pandas is a dev dependency only needed by this fixture helper
+    import pandas as pd
+
     # create example data from scratch
-    local_records = [
-        Row(id=1, first_name='Dan', second_name='Germain', floor=1),
-        Row(id=2, first_name='Dan', second_name='Sommerville', floor=1),
-        Row(id=3, first_name='Alex', second_name='Ioannides', floor=2),
-        Row(id=4, first_name='Ken', second_name='Lai', floor=2),
-        Row(id=5, first_name='Stu', second_name='White', floor=3),
-        Row(id=6, first_name='Mark', second_name='Sweeting', floor=3),
-        Row(id=7, first_name='Phil', second_name='Bird', floor=4),
-        Row(id=8, first_name='Kim', second_name='Suter', floor=4)
-    ]
-
-    df = spark.createDataFrame(local_records)
+    local_records = {
+        'id': [1, 2, 3, 4, 5, 6, 7, 8],
+        'first_name': ['Dan', 'Dan', 'Alex', 'Ken', 'Stu', 'Mark', 'Phil',
+                       'Kim'],
+        'second_name': ['Germain', 'Sommerville', 'Ioannides', 'Lai',
+                        'White', 'Sweeting', 'Bird', 'Suter'],
+        'floor': [1, 1, 2, 2, 3, 3, 4, 4]
+    }
+
+    # hand the records over to the JVM as one Arrow batch
+    df = spark.createDataFrame(pd.DataFrame(local_records))
+
+    # materialise once, both writes below reuse the cached records
+    df.cache()
+    df.count()
+
+    write_options = dict(
+        PARQUET_WRITE_OPTIONS,
+        compression=config.get('parquet_compression',
+                               PARQUET_WRITE_OPTIONS['compression']))
 
     # write to Parquet file format
-    (df
-     .coalesce(1)
+    (single_partition(df, repartition)
      .write
-     .parquet('file:///code/tests/domain/system/test_unit/test_data/employees', mode='overwrite'))
+     .options(**write_options)
+     .parquet(config.get('input_path', EMPLOYEES_PARQUET_PATH),
+              mode='overwrite'))
 
     # create transformed version of data
-    df_tf = transform_data(df, config['steps_per_floor'])
+    df_tf = transform_data(df, int(config['steps_per_floor']))
 
     # write transformed version of data to Parquet
-    (df_tf
-     .coalesce(1)
+    (single_partition(df_tf, repartition)
      .write
-     .parquet('file:///code/tests/domain/system/test_unit/test_data/employees_report', mode='overwrite'))
+     .options(**write_options)
+     .parquet(config.get('report_path', EMPLOYEES_REPORT_PARQUET_PATH),
+              mode='overwrite'))
 
+    df.unpersist()
     return None
 
 
-def job(spark: str, log: str, steps_per_floor: int) -> None:
+def job(spark: str, log: str, config: dict) -> None:
     """Job ETL script definition.
 
     Parameters:
@@ -164,43 +305,42 @@ def job(spark: str, log: str, steps_per_floor: int) -> None:
     Returns:
         None:Returning value
     """
+    job_name = config.get('job_name', 'etl_job_base')
+    steps_per_floor = int(config['steps_per_floor'])
+    input_path = config.get('input_path', EMPLOYEES_PARQUET_PATH)
+    output_path = config.get('output_path', OUTPUT_EMPLOYEES_PATH)
+    output_format = config.get('output_format', 'parquet')
+    merged_path = config.get('merged_output_path')
+    if merged_path and output_format != 'csv':
+        raise ValueError('merged_output_path requires csv output_format')
+
     # log that main ETL job is starting
-    log.warn('etl_job is up-and-running')
+    log.info('%s: start input=%s' % (job_name, input_path))
 
     # execute ETL pipeline
-    data = extract_data(spark)
-    data.show()
-    data_transformed = transform_data(data, steps_per_floor)
-    load_data(data_transformed)
-
-    # log the success and terminate Spark application
-    log.warn('test_etl_job is finished')
-    return None
+    data = extract_data(spark, input_path, floors=config.get('floors'))
 
+    # only the debug preview shares the scan with the write, so only
+    # then is it worth caching
+    debug = log.is_debug_enabled()
+    if debug:
+        data = data.persist(StorageLevel.MEMORY_AND_DISK)
+        log.debug(data._jdf.showString(20, 20, False))
 
-def set_up_args(args: list) -> list:
-    """Set up variables for the job.
-
-    Parameters:
-        args (list): Main spark session for the job.
-
-    Returns:
-        list:List of variables 
-    """
-    parser = argparse.ArgumentParser(
-        description='PySpark dummy template job args')
-    parser.add_argument('-jbn', '--job_name_arg',
-                        dest='job_name_arg',
-                        type=str)
-    parser.add_argument('-spf', '--steps_per_floor',
-                        dest='steps_per_floor',
-                        type=str)
-
-    args = parser.parse_args(args)
-
-    return args.job_name_arg, args.steps_per_floor
+    data_transformed = transform_data(data, steps_per_floor)
+    if merged_path:
+        merge_output(spark, data_transformed, output_path, merged_path)
+    else:
+        load_data(data_transformed, output_path, output_format)
+    if debug:
+        data.unpersist()
+
+    # log the success
+    log.info('%s: finished output=%s' % (
+        job_name, merged_path or output_path))
+    return None
 
 
 # entry point for PySpark ETL application
 if __name__ == '__main__':
-    main(sys.argv[1:])
+    main()
@@ -0,0 +1,91 @@
+"""
+spark_unit_test.py
+~~~~~~~~~~~~~~~~~~
+
+This module contains unit tests for the Spark helpers defined in
+dependencies/spark.py.
+"""
+import unittest
+import json
+import shutil
+import tempfile
+from os import path
+from unittest import mock
+
+from dependencies.spark import (
+    DEFAULT_SPARK_CONFIG, load_config, read_config_file, start_spark)
+
+
+class StartSparkTests(unittest.TestCase):
+    """Test suite for start_spark in spark.py
+    """
+    def setUp(self):
+        """Start Spark
+        """
+        self.spark, *_ = start_spark()
+
+    def tearDown(self):
+        """Stop Spark
+        """
+        self.spark.stop()
+
+    def test_default_spark_config(self):
+        """Test defaults are applied to a fresh session.
+        """
+        self.assertEqual(
+            DEFAULT_SPARK_CONFIG['spark.sql.adaptive.enabled'],
+            self.spark.conf.get('spark.sql.adaptive.enabled'))
+
+    def test_preset_conf_survives(self):
+        """Test a conf set on the active session is not overwritten by
+        the defaults when start_spark is called again.
+        """
+        # assemble
+        self.spark.conf.set('spark.sql.adaptive.enabled', 'false')
+
+        # act
+        spark, *_ = start_spark()
+
+        # assert
+        self.assertEqual('false', spark.conf.get('spark.sql.adaptive.enabled'))
+
+
+class LoadConfigTests(unittest.TestCase):
+    """Test suite for load_config in spark.py
+    """
+    def setUp(self):
+        """Write a config file to a temporary directory
+        """
+        config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, config_dir)
+        self.config_path = path.join(config_dir, 'etl_config.json')
+        with open(self.config_path, 'w') as config_file:
+            json.dump({'steps_per_floor': 21, 'floors': [1, 3]}, config_file)
+
+        read_config_file.cache_clear()
+        self.addCleanup(read_config_file.cache_clear)
+
+    def test_load_config_memoised(self):
+        """Test the config file is only opened once per path.
+        """
+        with mock.patch('dependencies.spark.open', create=True,
+                        side_effect=open) as mock_open:
+            first = load_config(self.config_path)
+            second = load_config(self.config_path)
+
+        self.assertEqual(1, mock_open.call_count)
+        self.assertEqual(first, second)
+
+    def test_load_config_returns_copy(self):
+        """Test changes to a returned config do not leak into later calls.
+        """
+        config = load_config(self.config_path)
+        config['steps_per_floor'] = 42
+        config['floors'].append(4)
+
+        self.assertEqual({'steps_per_floor': 21, 'floors': [1, 3]},
+                         load_config(self.config_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
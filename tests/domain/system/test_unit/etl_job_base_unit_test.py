@@ -8,10 +8,16 @@ that is bundled with the PySpark package.
 """
 import unittest
 import json
+import shutil
+import tempfile
+from os import listdir, path
 from pyspark.sql.functions import mean
 
+from dependencies.paths import (
+    EMPLOYEES_PARQUET_PATH, EMPLOYEES_REPORT_PARQUET_PATH)
 from dependencies.spark import start_spark
-from jobs.domain.system.etl_job_base import transform_data
+from jobs.domain.system.etl_job_base import (
+    extract_data, load_data, merge_output, transform_data)
 
 
 class SparkETLTestsSetUp(unittest.TestCase):
@@ -23,7 +29,10 @@ class SparkETLTestsSetUp(unittest.TestCase):
         """
         self.config = json.loads("""{"steps_per_floor": 21}""")
         self.spark, *_ = start_spark()
-        self.test_data_path = 'file:///code/tests/domain/system/test_unit/test_data/'
+
+        # fail rather than silently fall back to interpreted evaluation
+        self.spark.conf.set('spark.sql.codegen.factoryMode', 'CODEGEN_ONLY')
+        self.spark.conf.set('spark.sql.codegen.fallback', 'false')
 
     @classmethod
     def tearDown(self):
@@ -34,6 +43,39 @@ class SparkETLTestsSetUp(unittest.TestCase):
 
 
 class BaseJobETL(SparkETLTestsSetUp):
+    def test_extract_data_columns(self):
+        """Test data extractor column pruning.
+
+        Only the requested columns must be returned and read from the
+        Parquet files.
+        """
+        # act
+        data = extract_data(
+            self.spark, EMPLOYEES_PARQUET_PATH, columns=('id', 'floor'))
+        plan = data._jdf.queryExecution().sparkPlan().toString()
+
+        # assert
+        self.assertEqual(['id', 'floor'], data.columns)
+        self.assertEqual(8, data.count())
+        self.assertIn('ReadSchema: struct<id:bigint,floor:bigint>', plan)
+
+    def test_extract_data_floors(self):
+        """Test data extractor floor pruning.
+
+        The floors predicate must filter the returned rows and be pushed
+        down to the Parquet scan.
+        """
+        # act
+        data = extract_data(self.spark, EMPLOYEES_PARQUET_PATH, floors=[1, 3])
+        plan = data._jdf.queryExecution().sparkPlan().toString()
+
+        # assert
+        self.assertEqual([1, 2, 5, 6],
+                         sorted(row['id'] for row in data.collect()))
+        self.assertEqual({1, 3},
+                         {row['floor'] for row in data.collect()})
+        self.assertIn('In(floor, [1,3])', plan)
+
     def test_transform_data(self):
         """Test data transformer.
 
@@ -45,12 +87,12 @@ class BaseJobETL(SparkETLTestsSetUp):
         input_data = (
             self.spark
             .read
-            .parquet(self.test_data_path + 'employees'))
+            .parquet(EMPLOYEES_PARQUET_PATH))
 
         expected_data = (
             self.spark
             .read
-            .parquet(self.test_data_path + 'employees_report'))
+            .parquet(EMPLOYEES_REPORT_PARQUET_PATH))
 
         expected_data.show()
         input_data.show()
@@ -65,10 +107,10 @@ class BaseJobETL(SparkETLTestsSetUp):
         # act
         data_transformed = transform_data(input_data, 21)
 
-        cols = len(expected_data.columns)
-        rows = expected_data.count()
+        cols = len(data_transformed.columns)
+        rows = data_transformed.count()
         avg_steps = (
-            expected_data
+            data_transformed
             .agg(mean('steps_to_desk').alias('avg_steps_to_desk'))
             .collect()[0]
             ['avg_steps_to_desk'])
@@ -77,8 +119,75 @@ class BaseJobETL(SparkETLTestsSetUp):
         self.assertEqual(expected_cols, cols)
         self.assertEqual(expected_rows, rows)
         self.assertEqual(expected_avg_steps, avg_steps)
-        self.assertTrue([col in expected_data.columns
-                         for col in data_transformed.columns])
+        self.assertTrue(all(col in expected_data.columns
+                            for col in data_transformed.columns))
+        self.assertEqual(
+            sorted(expected_data.select(*data_transformed.columns).collect()),
+            sorted(data_transformed.collect()))
+
+    def test_load_data(self):
+        """Test data loader output formats.
+
+        The same input is written as Parquet and as gzip compressed CSV
+        and read back, an unknown format must be rejected.
+        """
+        # assemble
+        input_data = (
+            self.spark
+            .read
+            .parquet(EMPLOYEES_PARQUET_PATH))
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        parquet_path = path.join(output_dir, 'parquet')
+        csv_path = path.join(output_dir, 'csv')
+
+        # act
+        load_data(input_data, parquet_path, 'parquet')
+        load_data(input_data, csv_path, 'csv')
+
+        parquet_data = self.spark.read.parquet(parquet_path)
+        csv_data = self.spark.read.csv(csv_path, header=True)
+
+        # assert
+        self.assertEqual(input_data.count(), parquet_data.count())
+        self.assertEqual(sorted(input_data.columns),
+                         sorted(parquet_data.columns))
+        self.assertEqual(input_data.count(), csv_data.count())
+        self.assertEqual(sorted(input_data.columns),
+                         sorted(csv_data.columns))
+        self.assertTrue(any(filename.endswith('.csv.gz')
+                            for filename in listdir(csv_path)))
+        with self.assertRaises(ValueError):
+            load_data(input_data, path.join(output_dir, 'json'), 'json')
+
+    def test_merge_output(self):
+        """Test merging of CSV part files.
+
+        Parts written in parallel must end up in a single plain CSV file
+        with exactly one header row.
+        """
+        # assemble
+        input_data = (
+            self.spark
+            .read
+            .parquet(EMPLOYEES_PARQUET_PATH)
+            .repartition(2))
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        csv_path = path.join(output_dir, 'csv')
+        merged_path = path.join(output_dir, 'merged.csv')
+
+        # act
+        merge_output(self.spark, input_data, csv_path, merged_path)
+
+        with open(merged_path, 'r') as merged_file:
+            lines = merged_file.read().splitlines()
+
+        # assert
+        self.assertEqual(','.join(input_data.columns), lines[0])
+        self.assertEqual(input_data.count(), len(lines) - 1)
+        self.assertFalse(any(filename.endswith('.gz')
+                             for filename in listdir(csv_path)))
 
 
 if __name__ == '__main__':